@@ -1,7 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import io
+import hashlib
+from pathlib import Path
 import plotly.express as px
+import plotly.graph_objects as go
+
+try:
+    # Numba é opcional (não consta em requirements.txt): acelera a contagem dos KPIs em planilhas muito grandes
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 # --- Configuração da Página ---
 st.set_page_config(
@@ -11,103 +21,388 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# --- Cache em Disco ---
+# DataFrames já limpos são salvos em parquet, indexados pelo hash do conteúdo do arquivo.
+# Incremente CACHE_VERSION sempre que o pré-processamento de load_data mudar.
+CACHE_DIR = Path(".cache")
+CACHE_VERSION = 3
+
+# Colunas essenciais da planilha (as demais não são lidas)
+REQUIRED_COLS = ['Altura', 'Estado Contentor']
+
+# --- Codificação Compacta das Colunas ---
+# 'Altura' é armazenada como código int8 (0 = 0.75m, 1 = 1.50m)
+HEIGHT_CODES = {0: 0.75, 1: 1.50}
+# 'Estado Contentor' é categórica; status fora da regra de negócio viram 'outros'
+STATUS_CATEGORIES = ['Armazenado', 'Fora do Armazém', 'outros']
+ARM_CODE, FORA_CODE, OUTROS_CODE = range(len(STATUS_CATEGORIES))
+
+# Número de linhas por página na tabela de dados detalhados
+TABLE_PAGE_SIZE = 500
+
 # --- Funções Auxiliares ---
+def read_xlsx_read_only(raw_bytes, required_cols):
+    """
+    Lê um .xlsx com openpyxl em modo somente leitura (streaming de linhas, sem montar o workbook inteiro).
+    Retorna apenas as colunas necessárias, como texto, no mesmo formato do pd.read_excel.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(io.BytesIO(raw_bytes), read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        # Ignora dimensões gravadas incorretamente por alguns exportadores (linhas podem ter tamanhos diferentes)
+        ws.reset_dimensions()
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, ())
+        # Índices das colunas essenciais (tolerando espaços extras no cabeçalho)
+        col_idx = [i for i, col in enumerate(header) if col is not None and str(col).strip() in required_cols]
+        data = [[row[i] if i < len(row) else None for i in col_idx] for row in rows]
+    finally:
+        wb.close()
+
+    return pd.DataFrame(data, columns=[str(header[i]) for i in col_idx], dtype='string')
+
+def read_excel_bytes(raw_bytes, file_name, required_cols):
+    """
+    Lê apenas as colunas necessárias do Excel usando o motor 'calamine' (Rust).
+    Se 'python-calamine' não estiver instalado, usa openpyxl em modo somente leitura (.xlsx) ou xlrd (.xls).
+    """
+    read_kwargs = dict(
+        # Lê somente as colunas essenciais (tolerando espaços extras no cabeçalho)
+        usecols=lambda col: str(col).strip() in required_cols,
+        dtype={col: 'string' for col in required_cols},
+    )
+    try:
+        return pd.read_excel(io.BytesIO(raw_bytes), engine="calamine", **read_kwargs)
+    except ImportError:
+        if file_name.lower().endswith('.xlsx'):
+            return read_xlsx_read_only(raw_bytes, required_cols)
+        return pd.read_excel(io.BytesIO(raw_bytes), engine="xlrd", **read_kwargs)
+
 @st.cache_data
-def load_data(uploaded_file):
+def load_data(file_hash, _raw_bytes, _file_name):
     """
     Carrega e pré-processa os dados do arquivo Excel (.xls ou .xlsx) enviado.
+    O cache é indexado pelo hash do conteúdo ('file_hash'), não pelo objeto enviado,
+    então reenviar o mesmo arquivo reaproveita o resultado (em memória ou em disco).
+
+    Retorna (df, status_codes, height_codes): os códigos int8 de status e altura, alinhados
+    ao df, permitem que o dashboard calcule tudo sem tocar nas colunas a cada rerun.
     """
-    if uploaded_file is None:
-        return None
-    
+    cache_path = CACHE_DIR / f"{file_hash}-v{CACHE_VERSION}.parquet"
+    if cache_path.exists():
+        try:
+            df = pd.read_parquet(cache_path)
+            return df, df['Estado Contentor'].cat.codes.to_numpy(), df['Altura'].to_numpy()
+        except Exception:
+            # Arquivo de cache corrompido/ilegível: reprocessa o Excel normalmente
+            pass
+
     try:
-        # Tenta ler o arquivo como Excel (.xls ou .xlsx)
-        df = pd.read_excel(uploaded_file)
+        # Apenas as colunas essenciais são lidas (colunas extras e 'Unnamed:' nem chegam a ser carregadas)
+        df = read_excel_bytes(_raw_bytes, _file_name, REQUIRED_COLS)
 
         # --- Limpeza e Pré-processamento dos Dados ---
         
-        # 1. Limpeza de Colunas: Remove colunas não nomeadas e espaços extras
-        cols_to_drop = [col for col in df.columns if col.startswith('Unnamed:')]
-        if cols_to_drop:
-            df.drop(columns=cols_to_drop, inplace=True)
-            
-        df.columns = df.columns.str.strip() # Remove espaços em branco extras
+        # 1. Limpeza de Colunas: Remove espaços extras dos nomes
+        df.columns = df.columns.str.strip()
         
         # 2. Validação de colunas essenciais
-        required_cols = ['Altura', 'Estado Contentor']
-        if not all(col in df.columns for col in required_cols):
-            missing_cols = [col for col in required_cols if col not in df.columns]
+        if not all(col in df.columns for col in REQUIRED_COLS):
+            missing_cols = [col for col in REQUIRED_COLS if col not in df.columns]
             st.error(f"O arquivo enviado está faltando colunas necessárias: {missing_cols}")
             st.info("Verifique se as colunas estão nomeadas exatamente como: 'Altura' e 'Estado Contentor'")
             return None
 
-        # 3. Limpeza 'Estado Contentor': Remove todas as aspas e espaços
-        df['Estado Contentor'] = df['Estado Contentor'].astype(str).str.strip('"\' ').str.strip()
+        # As colunas são limpas em variáveis locais e o DataFrame final é montado uma única vez (passo 5)
 
-        # 4. Conversão 'Altura' para numérico
-        df['Altura'] = (
-            df['Altura'].astype(str)
-            .str.strip('"\' ')
-            .str.replace(',', '.', regex=False)
+        # 3. Limpeza 'Estado Contentor': Remove aspas e espaços das pontas em uma única passada (regex nativa do Arrow)
+        estado = (
+            df['Estado Contentor'].astype('string[pyarrow]')
+            .str.replace(r'^[\s"\']+|[\s"\']+$', '', regex=True)
         )
-        
+
+        # 4. Conversão 'Altura' para numérico: remove aspas/espaços e troca vírgula decimal por ponto
         # Converte para float, 'coerce' (força) os erros para NaN
-        df.dropna(subset=['Altura'], inplace=True)
-        df['Altura'] = pd.to_numeric(df['Altura'], errors='coerce')
+        altura = pd.to_numeric(
+            df['Altura'].astype('string[pyarrow]')
+            .str.replace(r'["\'\s]', '', regex=True)
+            .str.replace(',', '.', regex=False),
+            errors='coerce'
+        ).astype('float64').to_numpy()
 
-        
         # Limita as Alturas Apenas para os valores esperados (0.75m ou 1.50m)
-        valid_heights = [0.75, 1.50]
-        df = df[df['Altura'].isin(valid_heights)].copy()
+        # Para apenas dois valores, a comparação direta no array NumPy é mais rápida que .isin()
+        # NaN (vazios ou não numéricos) nunca é igual a 0.75/1.50, então não é preciso um dropna separado
+        valid_height_mask = (altura == 0.75) | (altura == 1.50)
         
-        if df.empty:
+        if not valid_height_mask.any():
             st.warning("O arquivo foi carregado, mas não contém dados válidos de 'Altura' (0.75 ou 1.50) após o pré-processamento.")
             return None
 
-        return df
+        # 5. Compactação: 'Altura' vira código int8 e 'Estado Contentor' vira categórica (comparações sobre códigos de 1 byte)
+        height_codes = np.where(altura[valid_height_mask] == 1.50, np.int8(1), np.int8(0))
+        # Os códigos de status saem de comparações '==' sobre a coluna string[pyarrow] (kernel nativo
+        # pyarrow.compute.equal), sem passar por objetos Python nem pela fatoração de pd.Categorical
+        estado = estado[valid_height_mask]
+        status_codes = np.full(len(estado), OUTROS_CODE, dtype=np.int8)
+        for code, status in enumerate(STATUS_CATEGORIES[:OUTROS_CODE]):
+            status_codes[(estado == status).to_numpy(dtype=bool, na_value=False)] = code
+
+        # Mantém o índice original (número da linha na planilha)
+        df = pd.DataFrame(
+            {
+                'Altura': height_codes,
+                'Estado Contentor': pd.Categorical.from_codes(status_codes, categories=STATUS_CATEGORIES),
+            },
+            index=df.index[valid_height_mask]
+        )
+
+        # Salva o resultado limpo para os próximos envios do mesmo arquivo
+        try:
+            CACHE_DIR.mkdir(exist_ok=True)
+            df.to_parquet(cache_path, compression="zstd")
+        except Exception:
+            # O cache em disco é apenas uma otimização; falhas aqui não impedem a análise
+            pass
+
+        return df, status_codes, height_codes
     
     except Exception as e:
-        # Este bloco captura erros de I/O, formato e falta das bibliotecas openpyxl/xlrd
-        st.error(f"Erro ao processar o arquivo. Verifique se as bibliotecas 'openpyxl' e 'xlrd' estão instaladas.")
+        # Este bloco captura erros de I/O, formato e falta das bibliotecas python-calamine/openpyxl/xlrd
+        st.error(f"Erro ao processar o arquivo. Verifique se as bibliotecas 'python-calamine', 'openpyxl' e 'xlrd' estão instaladas.")
         st.warning(f"Detalhe do erro: {e}")
         return None
 
-def display_dashboard(df, total_posicoes_geral, total_posicoes_075, total_posicoes_150):
+# A partir deste número de linhas, o custo de threads do Numba compensa. O limite supõe o kernel já
+# compilado no cache em disco (cache=True): na primeira chamada de um processo, a compilação JIT
+# leva ~2s, bem mais que o np.bincount
+NUMBA_MIN_ROWS = 1_000_000
+# Blocos processados em paralelo pelo kernel Numba (cada bloco tem seu próprio contador)
+NUMBA_CHUNKS = 64
+
+if njit is not None:
+    @njit(cache=True, parallel=True)
+    def count_pairs_numba(status_codes, height_codes, n_bins):
+        """Conta os pares (status, altura) em paralelo; cada bloco escreve em sua própria linha de 'partial'."""
+        n = status_codes.size
+        n_chunks = min(n, NUMBA_CHUNKS)
+        partial = np.zeros((n_chunks, n_bins), np.int64)
+        for c in prange(n_chunks):
+            for i in range(c * n // n_chunks, (c + 1) * n // n_chunks):
+                partial[c, status_codes[i] * 2 + height_codes[i]] += 1
+        counts = np.zeros(n_bins, np.int64)
+        for c in range(n_chunks):
+            for k in range(n_bins):
+                counts[k] += partial[c, k]
+        return counts
+else:
+    count_pairs_numba = None
+
+def count_status_height_pairs(status_codes, height_codes):
+    """
+    Conta as linhas por par (status, altura) no índice 'código do status * 2 + código da altura'.
+    Usa o kernel Numba para entradas grandes (se disponível) e np.bincount nos demais casos.
+    """
+    n_bins = 2 * len(STATUS_CATEGORIES)
+    if count_pairs_numba is not None and status_codes.size >= NUMBA_MIN_ROWS:
+        return count_pairs_numba(status_codes, height_codes, n_bins)
+    return np.bincount(status_codes * 2 + height_codes, minlength=n_bins)
+
+def format_num(num):
+    """Formata números com separador de milhar (ponto), ex: 4.060 ou -751."""
+    return format(num, ',').replace(',', '.')
+
+# --- Paleta Corporativa ---
+COR_VAZIO = '#0B72A4'       # Azul Corporativo (Disponibilidade)
+COR_OCUPADO = '#14854B'     # Verde Institucional (Ocupação)
+COR_FORA = '#B03A43'        # Vermelho Sóbrio (Alerta/Discrepância/Sobre-alocação)
+
+# --- Estilos CSS do Dashboard (cartões de métricas e legenda) ---
+DASHBOARD_CSS = f"""
+<style>
+    .card-grid {{ display: grid; grid-template-columns: repeat(6, 1fr); gap: 1rem; }}
+    .card {{ padding: 12px; border-radius: 8px; margin-bottom: 12px; border: 1px solid #ddd; height: 100%; }}
+    .card-vazio {{ border-left: 6px solid {COR_VAZIO}; background-color: rgba(11, 114, 164, 0.15); }}
+    .card-ocupado {{ border-left: 6px solid {COR_OCUPADO}; background-color: rgba(20, 133, 75, 0.15); }}
+    .card-fora {{ border-left: 6px solid {COR_FORA}; background-color: rgba(176, 58, 67, 0.15); }}
+    .card-valor {{ font-size: 1.8em; font-weight: 600; }}
+    .nota-discrepancia {{ padding: 10px; border-radius: 5px; background-color: #f7f7f7; }}
+    .nota-titulo {{ color: {COR_FORA}; font-weight: bold; }}
+</style>
+"""
+
+# Limite de figuras em cache (a chave inclui os totais da barra lateral, então cada novo total gera uma entrada)
+FIGURE_CACHE_MAX_ENTRIES = 32
+
+# --- Estilos Compartilhados dos Gráficos (definidos uma única vez) ---
+PIE_COLOR_MAP = {
+    'Armazenado': COR_OCUPADO,
+    'Vazio': COR_VAZIO,
+    'Excesso de Ocupação': COR_FORA # Usa a cor de alerta para Excesso de Ocupação
+}
+PIE_MARKER_LINE = dict(color='#FFFFFF', width=2)
+PIE_TRACE_STYLE = dict(
+    hole=0.4, # Transforma em Donut Chart
+    textinfo='percent+value',
+    textposition='inside',
+    hovertemplate='<b>%{label}</b><br>Quantidade: %{value}<br>Percentual: %{percent}<extra></extra>'
+)
+# Layout comum a todos os gráficos: título centralizado e fundo transparente
+CHART_LAYOUT = dict(
+    title=dict(x=0.5),
+    margin=dict(t=50, b=20, l=20, r=20),
+    paper_bgcolor='rgba(0,0,0,0)',
+    plot_bgcolor='rgba(0,0,0,0)',
+)
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_MAX_ENTRIES)
+def build_pie(armazenado, vazias, titulo):
+    """
+    Cria o gráfico de rosca de ocupação de uma altura.
+    A figura é reutilizada enquanto os números (e o título) não mudarem.
+    """
+    # Usa 'Excesso de Ocupação' para valores negativos
+    pie_status = 'Vazio' if vazias >= 0 else 'Excesso de Ocupação'
+    labels = ['Armazenado', pie_status]
+
+    # go.Pie direto: para duas fatias, evita o DataFrame temporário e o agrupamento do plotly.express
+    fig_pie = go.Figure(go.Pie(
+        labels=labels,
+        # Usamos o valor absoluto do VAZIO/EXCESSO para o gráfico
+        values=[armazenado, abs(vazias)],
+        marker=dict(colors=[PIE_COLOR_MAP[label] for label in labels], line=PIE_MARKER_LINE),
+        **PIE_TRACE_STYLE
+    ))
+    fig_pie.update_layout(**CHART_LAYOUT, title_text=titulo, template='plotly_white', legend_title="Status da Posição")
+    return fig_pie
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_MAX_ENTRIES)
+def build_discrepancy_bar(fora_armazem_075, fora_armazem_150):
+    """Cria o gráfico de barras de itens 'Fora do Armazém' por altura."""
+    discrepancy_data = {
+        'Altura': ['0.75m', '1.50m'],
+        'Fora do Armazém': [fora_armazem_075, fora_armazem_150]
+    }
+    df_discrepancy = pd.DataFrame(discrepancy_data)
+
+    fig_discrepancy = px.bar(
+        df_discrepancy,
+        x='Altura',
+        y='Fora do Armazém',
+        title='Contagem de Itens Fora do Armazém por Altura (Potencial de Entrada)', # Título ajustado para clareza
+        color='Altura',
+        color_discrete_sequence=[COR_FORA, '#D36A72'],
+        text_auto=True,
+        template='plotly_white',
+        hover_data={'Fora do Armazém': True, 'Altura': False}
+    )
+    fig_discrepancy.update_layout(
+        **CHART_LAYOUT,
+        xaxis_title="Altura da Posição",
+        yaxis_title="Número de Posições",
+        showlegend=False,
+        font=dict(size=12),
+        hovermode="x unified"
+    )
+    fig_discrepancy.update_xaxes(showline=True, linewidth=1, linecolor='lightgrey')
+    fig_discrepancy.update_yaxes(showgrid=True, gridwidth=1, gridcolor='lightgrey')
+    return fig_discrepancy
+
+def display_charts(results, titulo_075, titulo_150):
+    """Exibe os gráficos de ocupação e de discrepância (as figuras vêm do cache de build_pie/build_discrepancy_bar)."""
+
+    # --- Gráficos de Pizza Detalhados (PIE CHARTS) ---
+    st.divider()
+    st.header("Distribuição de Ocupação por Altura")
+    st.caption("Proporção entre posições Ocupadas (Armazenado) e Vagas (Vazio/Excesso de Ocupação).")
+
+    chart_col1, chart_col2 = st.columns(2)
+
+    with chart_col1:
+        # Gráfico de Pizza 1: Ocupação 0.75m
+        fig_pie_075 = build_pie(results['armazenado_075'], results['vagas_vazias_075'], titulo_075)
+        st.plotly_chart(fig_pie_075, use_container_width=True)
+
+    with chart_col2:
+        # Gráfico de Pizza 2: Ocupação 1.50m
+        fig_pie_150 = build_pie(results['armazenado_150'], results['vagas_vazias_150'], titulo_150)
+        st.plotly_chart(fig_pie_150, use_container_width=True)
+
+
+    # --- Gráfico de Alerta de Discrepância (Potential Put-Away) ---
+    st.subheader("Itens Registrados como 'Fora do Armazém' (Potencial a Armazenar)")
+
+    fig_discrepancy = build_discrepancy_bar(results['fora_armazem_075'], results['fora_armazem_150'])
+    st.plotly_chart(fig_discrepancy, use_container_width=True)
+
+@st.cache_data(show_spinner=False)
+def compute_counts(file_hash, _status_codes, _height_codes):
+    """
+    Conta os itens 'Armazenado' e 'Fora do Armazém' por altura.
+    As contagens dependem apenas do arquivo (cache indexado pelo hash), não dos totais da barra lateral.
+    """
+    # Os KPIs são calculados diretamente sobre os arrays de códigos pré-calculados em load_data.
+    # Contagens por (status, altura) em uma única passada vetorizada:
+    # índice = código do status * 2 + código da altura (ver STATUS_CATEGORIES e HEIGHT_CODES)
+    # contagens -> [armazenado_075, armazenado_150, fora_075, fora_150, (outros ignorados)]
+    pair_counts = count_status_height_pairs(_status_codes, _height_codes)
+    armazenado_075, armazenado_150, fora_075, fora_150 = (int(c) for c in pair_counts[:4])
+    return {
+        'armazenado_075': armazenado_075,
+        'armazenado_150': armazenado_150,
+        'fora_armazem_075': fora_075,
+        'fora_armazem_150': fora_150,
+    }
+
+@st.cache_data(show_spinner=False)
+def get_table_page(file_hash, page, _df, _status_codes):
+    """
+    Retorna uma página da tabela de dados (apenas 'Armazenado' e 'Fora do Armazém'),
+    com a altura decodificada (0/1 -> metros).
+    O cache é indexado pelo hash do arquivo e pelo número da página.
+    """
+    # Filtro: Manter apenas 'Armazenado' e 'Fora do Armazém' (conforme a regra de negócio)
+    df_filtered = _df[_status_codes != OUTROS_CODE]
+    first_row = (page - 1) * TABLE_PAGE_SIZE
+    df_page = df_filtered.iloc[first_row:first_row + TABLE_PAGE_SIZE]
+    return df_page.assign(Altura=df_page['Altura'].map(HEIGHT_CODES))
+
+def display_dashboard(df, status_codes, height_codes, file_hash, total_posicoes_geral, total_posicoes_075, total_posicoes_150):
     """Gera e exibe o dashboard principal no Streamlit."""
     
-    # --- FILTRAGEM E CÁLCULOS ---
+    # --- CÁLCULOS ---
     
-    # Filtro: Manter apenas 'Armazenado' e 'Fora do Armazém' (conforme a regra de negócio)
-    valid_status = ['Armazenado', 'Fora do Armazém']
-    df_filtered = df[df['Estado Contentor'].isin(valid_status)].copy()
-    
-    if df_filtered.empty:
+    # Contagens em cache (recalculadas só quando o arquivo muda); aqui resta apenas a aritmética com os totais
+    counts = compute_counts(file_hash, _status_codes=status_codes, _height_codes=height_codes)
+    armazenado_075, armazenado_150 = counts['armazenado_075'], counts['armazenado_150']
+    fora_075, fora_150 = counts['fora_armazem_075'], counts['fora_armazem_150']
+    armazenado_total = armazenado_075 + armazenado_150
+
+    if armazenado_total + fora_075 + fora_150 == 0:
         st.warning("Nenhum dado encontrado com os status 'Armazenado' ou 'Fora do Armazém' após a filtragem.")
         return
-        
-    # DataFrames específicos para KPIs (agora só contêm dados relevantes)
-    df_armazenado = df_filtered[df_filtered['Estado Contentor'] == 'Armazenado']
-    df_fora = df_filtered[df_filtered['Estado Contentor'] == 'Fora do Armazém']
 
     # Resultados Agrupados
     results = {
         # Gerais
-        'total_armazenado': len(df_armazenado),
-        'total_fora_armazem': len(df_fora),
+        'total_armazenado': armazenado_total,
+        'total_fora_armazem': fora_075 + fora_150,
         # VAGAS VAZIAS (SALDO) = Posições Totais - Itens Armazenados (pode ser negativo)
-        'vagas_vazias_geral': total_posicoes_geral - len(df_armazenado),
+        'vagas_vazias_geral': total_posicoes_geral - armazenado_total,
         
         # 0.75m
-        'armazenado_075': len(df_armazenado[df_armazenado['Altura'] == 0.75]),
-        'fora_armazem_075': len(df_fora[df_fora['Altura'] == 0.75]),
+        'armazenado_075': armazenado_075,
+        'fora_armazem_075': fora_075,
         # VAGAS VAZIAS 0.75m (SALDO)
-        'vagas_vazias_075': total_posicoes_075 - len(df_armazenado[df_armazenado['Altura'] == 0.75]),
+        'vagas_vazias_075': total_posicoes_075 - armazenado_075,
         
         # 1.50m
-        'armazenado_150': len(df_armazenado[df_armazenado['Altura'] == 1.50]),
-        'fora_armazem_150': len(df_fora[df_fora['Altura'] == 1.50]),
+        'armazenado_150': armazenado_150,
+        'fora_armazem_150': fora_150,
         # VAGAS VAZIAS 1.50m (SALDO)
-        'vagas_vazias_150': total_posicoes_150 - len(df_armazenado[df_armazenado['Altura'] == 1.50]),
+        'vagas_vazias_150': total_posicoes_150 - armazenado_150,
     }
 
     # Desempacota para facilitar o uso
@@ -115,24 +410,10 @@ def display_dashboard(df, total_posicoes_geral, total_posicoes_075, total_posico
     vagas_vazias_geral = results['vagas_vazias_geral']
     total_fora_armazem = results['total_fora_armazem']
 
-    # Função auxiliar para formatar números com separador de milhar (ponto)
-    def format_num(num):
-        # Garante que números negativos sejam formatados corretamente (ex: -751)
-        return f"{num:,}".replace(',', '.')
-
-    # --- Definição de Estilos e Paleta Corporativa ---
-    
-    # Cores da Paleta Corporativa
-    COR_VAZIO = '#0B72A4'       # Azul Corporativo (Disponibilidade)
-    COR_OCUPADO = '#14854B'     # Verde Institucional (Ocupação)
-    COR_FORA = '#B03A43'        # Vermelho Sóbrio (Alerta/Discrepância/Sobre-alocação)
+    # --- Definição de Estilos ---
     
-    # Estilos CSS para as métricas
-    common_style = "padding: 12px; border-radius: 8px; margin-bottom: 12px; border: 1px solid #ddd; height: 100%;" 
-    style_vazio = f"border-left: 6px solid {COR_VAZIO}; background-color: rgba(11, 114, 164, 0.15); {common_style}"  
-    style_ocupado = f"border-left: 6px solid {COR_OCUPADO}; background-color: rgba(20, 133, 75, 0.15); {common_style}" 
-    style_fora = f"border-left: 6px solid {COR_FORA}; background-color: rgba(176, 58, 67, 0.15); {common_style}"    
-    value_style = 'font-size: 1.8em; font-weight: 600;'
+    # Folha de estilos única; cartões e legenda referenciam apenas as classes
+    st.html(DASHBOARD_CSS)
 
 
     # --- Exibição dos KPIs Principais ---
@@ -177,9 +458,9 @@ def display_dashboard(df, total_posicoes_geral, total_posicoes_075, total_posico
     )
     
     # --- LEGENDA SOLICITADA PARA O KPI DE DISCREPÂNCIA ---
-    st.caption(f"""
-        <div style="padding: 10px; border-radius: 5px; background-color: #f7f7f7;">
-            <span style="color: {COR_FORA}; font-weight: bold;">ⓘ Nota sobre Discrepância:</span> O valor 'Fora do Armazém' inclui apenas itens com status 
+    st.caption("""
+        <div class="nota-discrepancia">
+            <span class="nota-titulo">ⓘ Nota sobre Discrepância:</span> O valor 'Fora do Armazém' inclui apenas itens com status 
             'Fora do Armazém' no arquivo de dados. Outros status temporários são ignorados para focar em problemas de inventário.
         </div>
     """, unsafe_allow_html=True)
@@ -190,19 +471,13 @@ def display_dashboard(df, total_posicoes_geral, total_posicoes_075, total_posico
     st.header("Análise Detalhada por Posição")
     st.caption(f"Posições de 0.75m: {format_num(total_posicoes_075)} | Posições de 1.50m: {format_num(total_posicoes_150)}")
 
-    metric_detail_cols = st.columns(6, gap="small")
-
     # 0.75m
     vazias_075 = results["vagas_vazias_075"]
     vazias_075_display = format_num(vazias_075) # Exibe o valor real (pode ser negativo)
     # Título dinâmico: "Vazias" se positivo/zero, "Sobre-alocação" se negativo
     vazias_075_title = "0.75m Vazias (Saldo)" if vazias_075 >= 0 else "0.75m Sobre-alocação"
     # Determina o estilo: Azul (Vazio) se >= 0, Vermelho (Alerta) se < 0
-    style_075 = style_vazio if vazias_075 >= 0 else style_fora 
-    
-    metric_detail_cols[0].markdown(f'<div style="{style_075}">{vazias_075_title}<br><span style="{value_style}">{vazias_075_display}</span></div>', unsafe_allow_html=True)
-    metric_detail_cols[1].markdown(f'<div style="{style_ocupado}">0.75m Armazenado<br><span style="{value_style}">{format_num(results["armazenado_075"])}</span></div>', unsafe_allow_html=True)
-    metric_detail_cols[2].markdown(f'<div style="{style_fora}">0.75m Fora do Armazém<br><span style="{value_style}">{format_num(results["fora_armazem_075"])}</span></div>', unsafe_allow_html=True)
+    card_075 = 'card-vazio' if vazias_075 >= 0 else 'card-fora' 
     
     # 1.50m
     vazias_150 = results["vagas_vazias_150"]
@@ -210,141 +485,46 @@ def display_dashboard(df, total_posicoes_geral, total_posicoes_075, total_posico
     # Título dinâmico: "Vazias" se positivo/zero, "Sobre-alocação" se negativo
     vazias_150_title = "1.50m Vazias (Saldo)" if vazias_150 >= 0 else "1.50m Sobre-alocação"
     # Determina o estilo: Azul (Vazio) se >= 0, Vermelho (Alerta) se < 0
-    style_150 = style_vazio if vazias_150 >= 0 else style_fora
-    
-    metric_detail_cols[3].markdown(f'<div style="{style_150}">{vazias_150_title}<br><span style="{value_style}">{vazias_150_display}</span></div>', unsafe_allow_html=True)
-    metric_detail_cols[4].markdown(f'<div style="{style_ocupado}">1.50m Armazenado<br><span style="{value_style}">{format_num(results["armazenado_150"])}</span></div>', unsafe_allow_html=True)
-    metric_detail_cols[5].markdown(f'<div style="{style_fora}">1.50m Fora do Armazém<br><span style="{value_style}">{format_num(results["fora_armazem_150"])}</span></div>', unsafe_allow_html=True)
-
-
-    # --- Gráficos de Pizza Detalhados (PIE CHARTS) ---
-    st.divider()
-    st.header("Distribuição de Ocupação por Altura")
-    st.caption("Proporção entre posições Ocupadas (Armazenado) e Vagas (Vazio/Excesso de Ocupação).")
-
-    # Data preparation for the pie charts
-    
-    # Chart 1: 0.75m (Usa 'Excesso de Ocupação' para valores negativos)
-    pie_status_075 = 'Vazio' if vazias_075 >= 0 else 'Excesso de Ocupação'
-    df_pie_075 = pd.DataFrame({
-        'Status': ['Armazenado', pie_status_075],
-        # Usamos o valor absoluto do VAZIO/EXCESSO para o gráfico
-        'Quantidade': [results['armazenado_075'], abs(vazias_075)]
-    })
-    
-    # Chart 2: 1.50m
-    pie_status_150 = 'Vazio' if vazias_150 >= 0 else 'Excesso de Ocupação'
-    df_pie_150 = pd.DataFrame({
-        'Status': ['Armazenado', pie_status_150],
-        'Quantidade': [results['armazenado_150'], abs(vazias_150)]
-    })
-
-    chart_col1, chart_col2 = st.columns(2)
-
-    with chart_col1:
-        # Gráfico de Pizza 1: Ocupação 0.75m
-        fig_pie_075 = px.pie(
-            df_pie_075,
-            names='Status',
-            values='Quantidade',
-            title=f'Ocupação de Posições 0.75m (Ref. Capacidade: {format_num(total_posicoes_075)})',
-            color='Status',
-            color_discrete_map={
-                'Armazenado': COR_OCUPADO,
-                'Vazio': COR_VAZIO,
-                'Excesso de Ocupação': COR_FORA # Usa a cor de alerta para Excesso de Ocupação
-            },
-            template='plotly_white',
-            hole=0.4, # Transforma em Donut Chart
-        )
-        fig_pie_075.update_traces(
-            textinfo='percent+value', 
-            textposition='inside',
-            marker=dict(line=dict(color='#FFFFFF', width=2)),
-            hovertemplate='<b>%{label}</b><br>Quantidade: %{value}<br>Percentual: %{percent}<extra></extra>'
-        )
-        fig_pie_075.update_layout(
-            title=dict(x=0.5),
-            legend_title="Status da Posição",
-            margin=dict(t=50, b=20, l=20, r=20),
-            paper_bgcolor='rgba(0,0,0,0)', 
-            plot_bgcolor='rgba(0,0,0,0)',
-        )
-        st.plotly_chart(fig_pie_075, use_container_width=True)
-
-    with chart_col2:
-        # Gráfico de Pizza 2: Ocupação 1.50m
-        fig_pie_150 = px.pie(
-            df_pie_150,
-            names='Status',
-            values='Quantidade',
-            title=f'Ocupação de Posições 1.50m (Ref. Capacidade: {format_num(total_posicoes_150)})',
-            color='Status',
-            color_discrete_map={
-                'Armazenado': COR_OCUPADO,
-                'Vazio': COR_VAZIO,
-                'Excesso de Ocupação': COR_FORA # Usa a cor de alerta para Excesso de Ocupação
-            },
-            template='plotly_white',
-            hole=0.4, # Transforma em Donut Chart
-        )
-        fig_pie_150.update_traces(
-            textinfo='percent+value',
-            textposition='inside',
-            marker=dict(line=dict(color='#FFFFFF', width=2)),
-            hovertemplate='<b>%{label}</b><br>Quantidade: %{value}<br>Percentual: %{percent}<extra></extra>'
-        )
-        fig_pie_150.update_layout(
-            title=dict(x=0.5),
-            legend_title="Status da Posição",
-            margin=dict(t=50, b=20, l=20, r=20),
-            paper_bgcolor='rgba(0,0,0,0)', 
-            plot_bgcolor='rgba(0,0,0,0)',
-        )
-        st.plotly_chart(fig_pie_150, use_container_width=True)
-
-
-    # --- Gráfico de Alerta de Discrepância (Potential Put-Away) ---
-    st.subheader("Itens Registrados como 'Fora do Armazém' (Potencial a Armazenar)")
+    card_150 = 'card-vazio' if vazias_150 >= 0 else 'card-fora'
+
+    # Os seis cartões são enviados em um único bloco HTML (grade CSS) em vez de seis colunas/elementos
+    cards = [
+        (card_075, vazias_075_title, vazias_075_display),
+        ('card-ocupado', "0.75m Armazenado", format_num(results["armazenado_075"])),
+        ('card-fora', "0.75m Fora do Armazém", format_num(results["fora_armazem_075"])),
+        (card_150, vazias_150_title, vazias_150_display),
+        ('card-ocupado', "1.50m Armazenado", format_num(results["armazenado_150"])),
+        ('card-fora', "1.50m Fora do Armazém", format_num(results["fora_armazem_150"])),
+    ]
+    cards_html = ''.join(
+        f'<div class="card {card_class}">{title}<br><span class="card-valor">{value}</span></div>'
+        for card_class, title, value in cards
+    )
+    st.markdown(f'<div class="card-grid">{cards_html}</div>', unsafe_allow_html=True)
 
-    discrepancy_data = {
-        'Altura': ['0.75m', '1.50m'],
-        'Fora do Armazém': [results['fora_armazem_075'], results['fora_armazem_150']]
-    }
-    df_discrepancy = pd.DataFrame(discrepancy_data)
 
-    fig_discrepancy = px.bar(
-        df_discrepancy,
-        x='Altura',
-        y='Fora do Armazém',
-        title='Contagem de Itens Fora do Armazém por Altura (Potencial de Entrada)', # Título ajustado para clareza
-        color='Altura',
-        color_discrete_sequence=[COR_FORA, '#D36A72'],
-        text_auto=True,
-        template='plotly_white',
-        hover_data={'Fora do Armazém': True, 'Altura': False}
-    )
-    fig_discrepancy.update_layout(
-        xaxis_title="Altura da Posição",
-        yaxis_title="Número de Posições",
-        showlegend=False,
-        margin=dict(t=50, b=20, l=20, r=20),
-        paper_bgcolor='rgba(0,0,0,0)', 
-        plot_bgcolor='rgba(0,0,0,0)',
-        font=dict(size=12),
-        title=dict(x=0.5), 
-        hovermode="x unified"
+    # --- Gráficos ---
+    display_charts(
+        results,
+        f'Ocupação de Posições 0.75m (Ref. Capacidade: {format_num(total_posicoes_075)})',
+        f'Ocupação de Posições 1.50m (Ref. Capacidade: {format_num(total_posicoes_150)})',
     )
-    fig_discrepancy.update_xaxes(showline=True, linewidth=1, linecolor='lightgrey')
-    fig_discrepancy.update_yaxes(showgrid=True, gridwidth=1, gridcolor='lightgrey')
-    st.plotly_chart(fig_discrepancy, use_container_width=True)
-
 
     st.divider()
 
     # --- Tabela de Dados Interativa ---
     st.header("Explore os Dados Detalhados (Apenas Armazenado e Fora do Armazém)")
-    st.dataframe(df_filtered, use_container_width=True, height=400, key='data_explorer')
+    # Apenas as colunas analisadas são lidas da planilha (ver read_excel_bytes)
+    st.caption(f"Somente as colunas analisadas ({', '.join(REQUIRED_COLS)}) são carregadas do arquivo; as demais colunas da planilha não aparecem nesta tabela.")
+    # Paginação no servidor: apenas a página atual é enviada ao navegador
+    total_rows = armazenado_total + fora_075 + fora_150
+    total_pages = max(1, -(-total_rows // TABLE_PAGE_SIZE))
+    page = st.number_input("Página", min_value=1, max_value=total_pages, value=1, step=1, key='data_explorer_page')
+    first_row = (page - 1) * TABLE_PAGE_SIZE
+    st.caption(f"Exibindo linhas {format_num(first_row + 1)}–{format_num(min(first_row + TABLE_PAGE_SIZE, total_rows))} de {format_num(total_rows)} (página {page} de {total_pages})")
+
+    df_page = get_table_page(file_hash, page, _df=df, _status_codes=status_codes)
+    st.dataframe(df_page, use_container_width=True, height=400, key='data_explorer')
 
 
 # --- Lógica Principal (Execução) ---
@@ -385,9 +565,12 @@ st.markdown("Visão geral da ocupação, vagas disponíveis e discrepâncias no
 if uploaded_file is None:
     st.info("Aguardando o envio do arquivo de dados para iniciar a análise.")
 else:
-    # Chama a função de carregamento (usa @st.cache_data para performance)
-    df = load_data(uploaded_file)
+    # Chama a função de carregamento (usa @st.cache_data + cache em disco, indexados pelo hash do conteúdo)
+    raw_bytes = uploaded_file.getvalue()
+    file_hash = hashlib.sha1(raw_bytes).hexdigest()
+    data = load_data(file_hash, raw_bytes, uploaded_file.name)
 
-    if df is not None:
+    if data is not None:
+        df, status_codes, height_codes = data
         # Chama a função de exibição do dashboard
-        display_dashboard(df, total_posicoes_geral, total_posicoes_075, total_posicoes_150)
+        display_dashboard(df, status_codes, height_codes, file_hash, total_posicoes_geral, total_posicoes_075, total_posicoes_150)